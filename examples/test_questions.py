@@ -96,7 +96,7 @@ def test_gadget_add_remove():
 
 
 def test_fast_simulation():
-    """Tests for FastSimulation.getBodies."""
+    """Tests for the Barnes-Hut interaction lists of FastSimulation.run (QuadTree.interactions)."""
     def test_on_three_circles(n):
         bodies = []
         for i in range(n):
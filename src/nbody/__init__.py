@@ -11,6 +11,7 @@ from nbody.box import Box
 from nbody.stack import Stack
 from nbody.gnode import GNode
 from nbody.gadget import Gadget
+from nbody.quadtree import QuadTree
 from nbody.simulation import Simulation
 from nbody.fast_simulation import FastSimulation
 
@@ -25,6 +26,7 @@ __all__ = [
     "Stack",
     "GNode",
     "Gadget",
+    "QuadTree",
     "Simulation",
     "FastSimulation",
 ]
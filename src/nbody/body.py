@@ -2,6 +2,8 @@
 Body class representing a celestial body in the n-body simulation.
 """
 
+import math
+
 from nbody.constants import G, scoeff, fcoeff
 
 
@@ -53,29 +55,36 @@ class Body:
         Returns:
             New Body object with updated position and velocity
         """
-        ret = Body(self.m, self.x, self.y)
+        x, y = self.x, self.y
+        ret = Body(self.m, x, y)
         ax = ay = 0       
         
         # For each body, compute its gravitational force and add to acceleration
         for p in Bodies:
-            if p == self:
+            if p is self:
                 continue  # Current Body does not affect itself
                 
             # Euclidean distance squared between p and this Body
             sq_distance = self.squareDist(p)
+            if sq_distance == 0:
+                continue  # Coincident Bodies exert no force on each other
             
-            # Vector form of Newton's law of gravity
+            # Vector form of Newton's law of gravity, with 1/r^3 computed once
+            # per pair via sqrt rather than two calls to pow, and G factored
+            # out of the sum
             # See: https://en.wikipedia.org/wiki/Newton%27s_law_of_universal_gravitation
-            ax += (p.x - self.x) * p.m * G / (sq_distance ** 1.5)
-            ay += (p.y - self.y) * p.m * G / (sq_distance ** 1.5)
+            f = p.m / (sq_distance * math.sqrt(sq_distance))
+            ax += (p.x - x) * f
+            ay += (p.y - y) * f
+        ax *= G
+        ay *= G
             
-        # Compute displacement due to acceleration and current velocity (inertia)
-        ret.x += dt * dt * ax + dt * self.vx
-        ret.y += dt * dt * ay + dt * self.vy
-        
-        # Compute the velocity vectors
-        ret.vx = (ret.x - self.x) / dt
-        ret.vy = (ret.y - self.y) / dt
+        # Semi-implicit Euler: kick the velocity with the acceleration, then
+        # drift the position with the new velocity
+        ret.vx = self.vx + dt * ax
+        ret.vy = self.vy + dt * ay
+        ret.x = x + dt * ret.vx
+        ret.y = y + dt * ret.vy
 
         return ret
 
@@ -2,10 +2,16 @@
 Box class for spatial partitioning in quadtree structures.
 """
 
+import numpy as np
+
 
 class Box:
     """Represents a rectangular spatial region for quadtree partitioning."""
     
+    # Boxes are created on every split of every tree build, so avoid a
+    # per-instance __dict__
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'maxSide', 'maxSide2', 'mx', 'my')
+
     def __init__(self, x0, y0, x1, y1):
         """
         Initialize a Box.
@@ -17,13 +23,15 @@ class Box:
             y1: top boundary
         """
         self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
-        self.maxSide = max(self.x1 - self.x0, self.y1 - self.y0)
-        self.mx = (self.x0 + self.x1) / 2
-        self.my = (self.y0 + self.y1) / 2
+        self.maxSide = max(x1 - x0, y1 - y0)
+        self.maxSide2 = self.maxSide * self.maxSide   # squared, for Barnes-Hut
+        self.mx = (x0 + x1) / 2
+        self.my = (y0 + y1) / 2
         
     def isIn(self, p):
         """Check if a point (Body) is inside this box."""
-        return self.x0 <= p.x <= self.x1 and self.y0 <= p.y <= self.y1
+        x, y = p.x, p.y
+        return self.x0 <= x <= self.x1 and self.y0 <= y <= self.y1
     
     def asTuple(self):
         """Return box coordinates as tuple (x0, y0, x1, y1, mx, my)."""
@@ -55,19 +63,25 @@ class Box:
         """
         if len(P) == 0:
             return None
-        x0 = x1 = P[0].x
-        y0 = y1 = P[0].y
-        for p in P: 
-            if p.x < x0:
-                x0 = p.x
-            if p.y < y0:
-                y0 = p.y
-            if p.x > x1:
-                x1 = p.x
-            if p.y > y1:
-                y1 = p.y
-        return Box(x0, y0, x1, y1)    
-    
+        x = np.fromiter((p.x for p in P), dtype=np.float64, count=len(P))
+        y = np.fromiter((p.y for p in P), dtype=np.float64, count=len(P))
+        return Box.fromArrays(x, y)
+
+    @staticmethod
+    def fromArrays(x, y):
+        """
+        Build a box that encloses all points given as coordinate arrays.
+
+        Args:
+            x, y: (N,) arrays of coordinates
+
+        Returns:
+            Box object enclosing all points, or None if there are none
+        """
+        if len(x) == 0:
+            return None
+        return Box(float(np.min(x)), float(np.min(y)), float(np.max(x)), float(np.max(y)))
+
     def __str__(self):
         return f"Box({self.x0},{self.y0},{self.x1},{self.y1})"
 
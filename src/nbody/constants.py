@@ -14,6 +14,10 @@ import math
 # Universal gravitational constant (AU^3/M_sun/yr^2)
 G = 4 * (math.pi) ** 2
 
+# Suggested squared Plummer softening length (AU^2) for Simulation's eps2.
+# Force kernels then use 1/(r^2 + eps^2)^1.5 so near-collisions stay finite
+SOFTENING2 = 1e-8
+
 # Scorching coefficient, approx. 0.745 AU from the Sun (L_sun/AU^2)
 scoeff = 22.62
 
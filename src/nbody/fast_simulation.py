@@ -2,46 +2,123 @@
 FastSimulation class using Barnes-Hut algorithm for efficient n-body simulations.
 """
 
-from nbody.simulation import Simulation
-from nbody.gadget import Gadget
+import numpy as np
+
+from nbody import _kernels
+from nbody.body import Body
+from nbody.constants import G
+from nbody.simulation import Simulation, _advance
+from nbody.quadtree import QuadTree
 
 
 class FastSimulation(Simulation):
     """
     Fast n-body simulation using Barnes-Hut algorithm.
     
-    Uses a quadtree (Gadget) to approximate gravitational forces,
+    Uses a quadtree (QuadTree) to approximate gravitational forces,
     reducing computational complexity from O(n²) to O(n log n).
     """
     
+    # Barnes-Hut opening angle, used by run's QuadTree walks and by BarnesHut
+    theta = 0.7
+
+    ALGORITHMS = ('auto', 'dense', 'tree')
+
+    # With algorithm='auto', systems of fewer bodies than this use the dense
+    # O(n²) kernel of Simulation, where building and walking the tree every
+    # timestep costs more than summing every pair. The crossover depends on
+    # which dense kernel runs: around a hundred bodies for the NumPy one, a
+    # couple of thousand for the compiled Numba one (fewer on a single core)
+    DENSE_MAX_N = 128
+    DENSE_MAX_N_NUMBA = 2048
+
+    def __init__(self, Bodies, total_time=10, dt=0.01, algorithm='auto', **kwargs):
+        """
+        Initialize a simulation.
+
+        Args:
+            Bodies: list of Body objects to simulate
+            total_time: total simulation time in years (default: 10)
+            dt: time step in years (default: 0.01)
+            algorithm: 'tree' for Barnes-Hut, 'dense' for the direct
+                       calculation of Simulation, or 'auto' to pick 'dense'
+                       below DENSE_MAX_N bodies (DENSE_MAX_N_NUMBA when the
+                       Numba kernel is used) and 'tree' above (default: 'auto').
+                       The tree runs on the CPU with the NumPy or Numba
+                       kernels, so with device='cuda' or backend='python'
+                       'auto' always picks 'dense' and 'tree' is rejected
+            **kwargs: remaining options of Simulation (backend, eps2, ...)
+
+        Raises:
+            ValueError: for an unknown algorithm, or algorithm='tree' with
+                        device='cuda' or backend='python'
+        """
+        if algorithm not in FastSimulation.ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {FastSimulation.ALGORITHMS}")
+        super().__init__(Bodies, total_time, dt, **kwargs)
+        unsupported = self._treeUnsupported()
+        if algorithm == 'tree' and unsupported:
+            raise ValueError(f"algorithm='tree' runs the QuadTree on the CPU and does not support {unsupported}")
+        self.algorithm = algorithm
+
+    def _treeUnsupported(self):
+        """Return the option the tree algorithm cannot honour, or None."""
+        if self.device == 'cuda':
+            return "device='cuda'"
+        if self.backend == 'python':
+            return "backend='python'"
+        return None
+
+    def _denseMaxN(self):
+        """Size below which algorithm='auto' uses the dense kernel self.backend selects."""
+        if self._stepFunction() is _kernels.step:
+            return FastSimulation.DENSE_MAX_N_NUMBA
+        return FastSimulation.DENSE_MAX_N
+
     def run(self, test=None): 
         """
         Run the simulation using Barnes-Hut approximation.
         
-        The t-th entry in the list is the position of Bodies after the t-th timestep
-        has been simulated. Simulation uses a Gadget to approximate for each body
-        the list of other bodies gravitationally affecting its trajectory.
+        The t-th entry is the state of the Bodies after the t-th timestep
+        has been simulated. Each timestep builds a flat-array QuadTree and uses
+        it to approximate for each body the list of other bodies gravitationally
+        affecting its trajectory. Small systems are handed to Simulation.run
+        instead, see self.algorithm.
         
         Args:
-            test: optional array to store the bodies used for each body (for debugging)
+            test: optional array to store the bodies used for each body (for
+                  debugging); always runs the tree algorithm
             
         Returns:
-            List of lists, where each inner list contains Body objects at that timestep
+            (timesteps + 1, N, 4) array, where entry [t, i] holds the
+            (x, y, vx, vy) of body i at timestep t; masses are in self.mass.
+            With device='cuda' this is a cupy.ndarray in GPU memory.
+
+        Raises:
+            ValueError: if test is given with device='cuda' or backend='python'
         """
-        pss = [None] * (self.timesteps + 1)
-        pss[0] = self.bodies
+        N = len(self.mass)
+        unsupported = self._treeUnsupported()
+        if test is not None and unsupported:
+            raise ValueError(f"run(test=...) needs the tree algorithm, which does not support {unsupported}")
+        if N == 0 or (test is None and (self.algorithm == 'dense' or
+                                        (self.algorithm == 'auto' and
+                                         (unsupported or N < self._denseMaxN())))):
+            return super().run()
+        m = self.mass
+        pss = np.empty((self.timesteps + 1, N, 4), dtype=self.dtype)
+        pss[0] = self.state
         for t in range(self.timesteps):
-            # Calculate the current Gadget
-            g = Gadget.fromBodies(pss[t])
-            # For every Body in the current timestep, add its next position in next timestep
-            # but using the gadget g
-            A = pss[t][:]
-            for i in range(len(A)):
-                new_ps = FastSimulation.getBodies(g, A[i])
-                A[i] = A[i].next(new_ps, self.dt)
-                if test is not None:
-                    test[i] = new_ps
-            pss[t + 1] = A
+            x, y, vx, vy = pss[t].T.copy()
+            # Calculate the current tree
+            tree = QuadTree.fromArrays(m, x, y)
+            # For every Body in the current timestep, sum the pull of the
+            # sources the tree selects for it
+            ax, ay = tree.accelerations(self.theta, self.eps2)
+            if test is not None:
+                for i in range(N):
+                    test[i] = [Body(*row) for row in tree.interactions(i, self.theta).tolist()]
+            pss[t + 1] = np.stack(_advance(x, y, vx, vy, G * ax, G * ay, self.dt), axis=1)
         return pss
 
     @staticmethod
@@ -59,11 +136,11 @@ class FastSimulation(Simulation):
         Returns:
             True if the node should be opened (examined), False if it can be approximated
         """
-        theta = 0.7
+        theta = FastSimulation.theta
         if n.box.isIn(p):
             return True
-        sqDist = (n.COM.x - p.x) ** 2 + (n.COM.y - p.y) ** 2
-        return n.box.maxSide ** 2 / sqDist >= theta ** 2
+        sqDist = (n.com_x - p.x) ** 2 + (n.com_y - p.y) ** 2
+        return n.box.maxSide2 / sqDist >= theta ** 2
         
     @staticmethod
     def getBodies(g, p, shouldOpen=BarnesHut):
@@ -74,6 +151,10 @@ class FastSimulation(Simulation):
         should be "opened" (i.e. their subnodes examined) or not (i.e. the whole
         subtree approximated by its COM).
         
+        This is the object-tree (Gadget/GNode) version of the traversal.
+        FastSimulation.run does not call it: it walks the flat QuadTree instead,
+        through QuadTree.accelerations, and QuadTree.interactions for run(test=...).
+        
         Args:
             g: Gadget to query
             p: Body reference point
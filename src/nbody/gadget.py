@@ -7,7 +7,6 @@ from matplotlib.patches import Rectangle
 
 from nbody.box import Box
 from nbody.gnode import GNode
-from nbody.stack import Stack
 
 
 class Gadget:
@@ -56,17 +55,15 @@ class Gadget:
         """
         A = [None] * self.size
         i = 0
-        stack = Stack()
-        stack.push(self.root)
-        while not stack.isEmpty():
+        stack = [self.root]
+        while stack:
             n = stack.pop()
             if n.isLeaf():
                 if n.p is not None:
                     A[i] = n.p
                     i += 1
             else:
-                for c in n.children:
-                    stack.push(c)
+                stack.extend(n.children)
         return A   
 
     @staticmethod
@@ -81,21 +78,11 @@ class Gadget:
             Gadget object containing all bodies, or None if ps is empty
         """
         # Calculate bottom-left and top-right positions
-        if ps == []:
+        box = Box.getBox(ps)
+        if box is None:
             return None
-        x0 = x1 = ps[0].x
-        y0 = y1 = ps[0].y
-        for p in ps:
-            if p.x < x0:
-                x0 = p.x
-            elif p.x > x1:
-                x1 = p.x
-            if p.y < y0:
-                y0 = p.y
-            elif p.y > y1:
-                y1 = p.y
         # Build gadget and add bodies
-        g = Gadget(Box(x0, y0, x1, y1))
+        g = Gadget(box)
         for p in ps:
             g.add(p)
         return g    
@@ -118,8 +105,8 @@ class Gadget:
         ax.add_patch(rect)
         # Draw COM for internal nodes
         if showCom and not node.isLeaf():
-            ax.plot([node.COM.x], [node.COM.y], marker='+', markersize=6)
-            ax.plot([mx, node.COM.x], [my, node.COM.y], linewidth=0.3)            
+            ax.plot([node.com_x], [node.com_y], marker='+', markersize=6)
+            ax.plot([mx, node.com_x], [my, node.com_y], linewidth=0.3)            
         # Draw leaf contents
         if node.isLeaf(): 
             if node.p is not None:
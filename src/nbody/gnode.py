@@ -8,6 +8,8 @@ from nbody.body import Body
 class GNode:
     """Represents a node in the quadtree for spatial partitioning."""
     
+    __slots__ = ('box', 'com_m', 'com_x', 'com_y', 'nbodies', 'p', 'children')
+
     def __init__(self, box):
         """
         Initialize a GNode.
@@ -16,34 +18,58 @@ class GNode:
             box: Box object defining the spatial region of this node
         """
         self.box = box
-        self.COM = None           # this node's center of mass
+        self.com_m = 0            # this node's center of mass (mass, x, y);
+        self.com_x = box.mx       # an empty node has zero mass at its centre
+        self.com_y = box.my
         self.nbodies = 0          # number of bodies contained in node
         self.p = None             # if this node is a leaf with a Body
         self.children = None      # children are: [NE, NW, SW, SE]
-        self.updateCOM()
+
+    @property
+    def COM(self):
+        """This node's center of mass as a Body."""
+        return Body(self.com_m, self.com_x, self.com_y)
 
     def isLeaf(self):
         """Check if this node is a leaf (contains fewer than 2 bodies)."""
         return self.nbodies < 2
         
     def updateCOM(self):
-        """Update the center of mass (COM) of this node."""
+        """Update the center of mass (COM) of this node from its children."""
         if self.isLeaf(): 
-            if self.p == None:
-                self.COM = Body(0, self.box.mx, self.box.my)
+            if self.p is None:
+                self.com_m, self.com_x, self.com_y = 0, self.box.mx, self.box.my
             else:
-                self.COM = Body(self.p.m, self.p.x, self.p.y)
+                self.com_m, self.com_x, self.com_y = self.p.m, self.p.x, self.p.y
             return
             
         x = y = m = 0
         for c in self.children:
-            x += c.COM.x * c.COM.m
-            y += c.COM.y * c.COM.m
-            m += c.COM.m
+            x += c.com_x * c.com_m
+            y += c.com_y * c.com_m
+            m += c.com_m
         if m > 0:
-            self.COM = Body(m, x / m, y / m)
+            self.com_m, self.com_x, self.com_y = m, x / m, y / m
         else:
-            self.COM = Body(0, self.box.mx, self.box.my)
+            self.com_m, self.com_x, self.com_y = 0, self.box.mx, self.box.my
+
+    def recomputeCOM(self):
+        """
+        Update the COM of this node and every node below it.
+
+        Makes a single bottom-up pass using an explicit stack, so it can be
+        called once after a batch of insertions instead of after each one.
+        """
+        order = []
+        stack = [self]
+        while stack:
+            n = stack.pop()
+            order.append(n)
+            if n.children is not None:
+                stack.extend(n.children)
+        # Reversed pre-order visits every child before its parent
+        for n in reversed(order):
+            n.updateCOM()
 
     def niceStr(self): 
         """
@@ -60,7 +86,7 @@ class GNode:
             if ptr == None:
                 raise Exception("A None GNode was found")
             val = f"{len(A)}:{ptr.box},{ptr.nbodies}"
-            A.append(f"({ptr.COM.m}, {ptr.COM.x}, {ptr.COM.y})")
+            A.append(f"({ptr.com_m}, {ptr.com_x}, {ptr.com_y})")
             if ptr.children == None:
                 return acc + pre + val
             if pre == vdash:
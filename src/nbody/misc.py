@@ -85,6 +85,9 @@ def time_function(func: Callable, *args, **kwargs) -> Tuple[Any, float]:
     """
     Time a function call and return both the result and elapsed time.
     
+    Legacy helper kept for existing scripts; tests/test_runner.py reads
+    time.perf_counter_ns around each test directly instead.
+    
     Args:
         func: The function to time.
         *args: Positional arguments to pass to the function.
@@ -0,0 +1,513 @@
+"""
+Flat array-based quadtree used by FastSimulation for Barnes-Hut traversal.
+
+Gadget and GNode build the tree out of Python objects, which is convenient for
+inspection and plotting but costs O(N) object allocations per timestep. This
+quadtree stores the same information as parallel NumPy arrays indexed by node
+number, so building and walking it can be compiled with Numba.
+"""
+
+import math
+
+import numpy as np
+
+from nbody import stack_nb
+from nbody._kernels import NUMBA_AVAILABLE, njit, prange
+from nbody.box import Box
+
+# Deepest level a node can be split to. Bodies that still share a leaf at this
+# depth (e.g. coincident bodies) are chained together in that leaf instead.
+MAX_DEPTH = 48
+
+# Nodes a depth-first walk can hold at once: at most three siblings waiting on
+# each level, plus the four children of the deepest node
+STACK_SIZE = 4 * MAX_DEPTH + 4
+
+# Bodies per prange iteration of _accelerations. Each iteration allocates one
+# traversal stack and reuses it for all of its bodies
+CHUNK_SIZE = 64
+
+
+@njit(cache=True)
+def _quadrant(box, n, px, py):
+    """Index of the child of node n containing (px, py), in [NE, NW, SW, SE] order."""
+    mx = (box[n, 0] + box[n, 2]) / 2
+    my = (box[n, 1] + box[n, 3]) / 2
+    if py >= my:
+        return 0 if px >= mx else 1
+    return 3 if px >= mx else 2
+
+
+@njit(cache=True)
+def _split(box, com, children, body, nbodies, n, count):
+    """Allocate the four children of leaf n starting at node index count."""
+    x0, y0, x1, y1 = box[n, 0], box[n, 1], box[n, 2], box[n, 3]
+    mx = (x0 + x1) / 2
+    my = (y0 + y1) / 2
+    # Same layout as Box.split4: [NE, NW, SW, SE]
+    bounds = ((mx, my, x1, y1), (x0, my, mx, y1), (x0, y0, mx, my), (mx, y0, x1, my))
+    for q in range(4):
+        c = count + q
+        box[c, 0], box[c, 1], box[c, 2], box[c, 3] = bounds[q]
+        com[c, 0] = com[c, 1] = com[c, 2] = 0.0
+        children[c, 0] = children[c, 1] = children[c, 2] = children[c, 3] = -1
+        body[c] = -1
+        nbodies[c] = 0
+        children[n, q] = c
+
+
+@njit(cache=True)
+def _addMass(com, n, pm, px, py):
+    """Fold a point mass into the running centre of mass of node n."""
+    m = com[n, 0] + pm
+    if m > 0:
+        com[n, 1] = (com[n, 1] * com[n, 0] + px * pm) / m
+        com[n, 2] = (com[n, 2] * com[n, 0] + py * pm) / m
+    else:
+        com[n, 1] = px
+        com[n, 2] = py
+    com[n, 0] = m
+
+
+@njit(cache=True)
+def _insert(i, m, x, y, box, com, children, body, nxt, nbodies, count):
+    """
+    Insert body i, chasing children[node, q] down from the root.
+
+    The caller guarantees room for 4 * MAX_DEPTH new nodes.
+
+    Returns:
+        The new number of allocated nodes
+    """
+    px, py, pm = x[i], y[i], m[i]
+    n = 0
+    depth = 0
+    while True:
+        nbodies[n] += 1
+        _addMass(com, n, pm, px, py)
+        if children[n, 0] < 0:
+            if nbodies[n] == 1:
+                body[n] = i
+                return count
+            if depth >= MAX_DEPTH:
+                nxt[i] = body[n]
+                body[n] = i
+                return count
+            # Occupied leaf: split it and push its body one level down
+            _split(box, com, children, body, nbodies, n, count)
+            count += 4
+            j = body[n]
+            body[n] = -1
+            c = children[n, _quadrant(box, n, x[j], y[j])]
+            body[c] = j
+            nbodies[c] = 1
+            _addMass(com, c, m[j], x[j], y[j])
+        n = children[n, _quadrant(box, n, px, py)]
+        depth += 1
+
+
+@njit(cache=True)
+def _build(start, m, x, y, box, com, children, body, nxt, nbodies, count):
+    """
+    Insert bodies start, start+1, ... until they run out or the node arrays
+    might overflow.
+
+    Returns:
+        Tuple (index of the next body to insert, number of allocated nodes)
+    """
+    capacity = box.shape[0]
+    i = start
+    while i < x.shape[0] and count + 4 * MAX_DEPTH <= capacity:
+        count = _insert(i, m, x, y, box, com, children, body, nxt, nbodies, count)
+        i += 1
+    return i, count
+
+
+@njit(cache=True)
+def _interactions(i, px, py, theta2, m, x, y, box, com, children, body, nxt, nbodies, out, stack):
+    """
+    Collect the sources acting on body i at (px, py) under the Barnes-Hut criterion.
+
+    A node is opened if (px, py) lies inside it or maxSide² / sqDist >= theta²,
+    exactly as in FastSimulation.BarnesHut; otherwise its centre of mass is
+    used. Leaves contribute their actual bodies.
+
+    Args:
+        i: index of the target body, skipped if met in a leaf (-1 for none)
+        out: (N, 3) float64 array receiving (m, x, y) rows
+        stack: (STACK_SIZE,) int32 scratch buffer for the walk
+
+    Returns:
+        Number of rows written to out
+    """
+    top = stack_nb.push(stack, 0, 0)
+    k = 0
+    while top > 0:
+        n, top = stack_nb.pop(stack, top)
+        if nbodies[n] == 0:
+            continue
+        if children[n, 0] < 0:
+            j = body[n]
+            while j >= 0:
+                if j != i:
+                    out[k, 0], out[k, 1], out[k, 2] = m[j], x[j], y[j]
+                    k += 1
+                j = nxt[j]
+            continue
+        x0, y0, x1, y1 = box[n, 0], box[n, 1], box[n, 2], box[n, 3]
+        if not (x0 <= px <= x1 and y0 <= py <= y1):
+            dx = com[n, 1] - px
+            dy = com[n, 2] - py
+            side = max(x1 - x0, y1 - y0)
+            if side * side < theta2 * (dx * dx + dy * dy):
+                out[k, 0], out[k, 1], out[k, 2] = com[n, 0], com[n, 1], com[n, 2]
+                k += 1
+                continue
+        for q in range(4):
+            top = stack_nb.push(stack, top, children[n, q])
+    return k
+
+
+@njit(cache=True)
+def _accumulateForce(i, px, py, theta2, eps2, m, x, y, box, com, children, body, nxt, nbodies,
+                     stack):
+    """
+    Sum the pull on body i at (px, py) over the sources chosen by _interactions.
+
+    Walks the tree in the same order with the same Barnes-Hut criterion, but
+    accumulates each source as soon as it is accepted instead of collecting
+    it into a buffer. stack is a (STACK_SIZE,) int32 scratch buffer.
+
+    Returns:
+        Tuple (ax, ay) of the acceleration on body i, not yet multiplied by G
+    """
+    top = stack_nb.push(stack, 0, 0)
+    ax = 0.0
+    ay = 0.0
+    while top > 0:
+        n, top = stack_nb.pop(stack, top)
+        if nbodies[n] == 0:
+            continue
+        if children[n, 0] < 0:
+            j = body[n]
+            while j >= 0:
+                if j != i:
+                    dx = x[j] - px
+                    dy = y[j] - py
+                    r2 = dx * dx + dy * dy + eps2
+                    if r2 > 0:
+                        f = m[j] / (r2 * math.sqrt(r2))
+                        ax += dx * f
+                        ay += dy * f
+                j = nxt[j]
+            continue
+        x0, y0, x1, y1 = box[n, 0], box[n, 1], box[n, 2], box[n, 3]
+        if not (x0 <= px <= x1 and y0 <= py <= y1):
+            dx = com[n, 1] - px
+            dy = com[n, 2] - py
+            d2 = dx * dx + dy * dy
+            side = max(x1 - x0, y1 - y0)
+            if side * side < theta2 * d2:
+                r2 = d2 + eps2
+                f = com[n, 0] / (r2 * math.sqrt(r2))
+                ax += dx * f
+                ay += dy * f
+                continue
+        for q in range(4):
+            top = stack_nb.push(stack, top, children[n, q])
+    return ax, ay
+
+
+@njit(parallel=True, cache=True)
+def _accelerations(theta2, eps2, m, x, y, box, com, children, body, nxt, nbodies, ax, ay):
+    """Fill ax, ay with _accumulateForce for every body, spread across cores."""
+    n = x.shape[0]
+    for c in prange((n + CHUNK_SIZE - 1) // CHUNK_SIZE):
+        stack = np.empty(STACK_SIZE, np.int32)
+        for i in range(c * CHUNK_SIZE, min(n, (c + 1) * CHUNK_SIZE)):
+            ax[i], ay[i] = _accumulateForce(i, x[i], y[i], theta2, eps2, m, x, y, box, com,
+                                            children, body, nxt, nbodies, stack)
+
+
+class FrontierQueue:
+    """
+    Level-order frontier of (body, node) pairs for batched tree traversal.
+
+    Instead of walking the tree once per body, every body starts at the root
+    and each sweep processes the whole frontier with NumPy: pairs are either
+    resolved or replaced by their children in the next level. The pairs of the
+    current level and of the next one live in two preallocated buffers that
+    are swapped between sweeps.
+    """
+
+    def __init__(self, capacity):
+        """
+        Initialize an empty FrontierQueue.
+
+        Args:
+            capacity: number of pairs to preallocate per level (grown as needed)
+        """
+        capacity = max(capacity, 1)
+        self.body_idx = np.empty(capacity, dtype=np.int32)
+        self.node_idx = np.empty(capacity, dtype=np.int32)
+        self.length = 0
+        self._next_body = np.empty(capacity, dtype=np.int32)
+        self._next_node = np.empty(capacity, dtype=np.int32)
+        self._next_length = 0
+
+    def __len__(self):
+        return self.length
+
+    def current(self):
+        """
+        Get the pairs of the current level.
+
+        Returns:
+            Tuple (body_idx, node_idx) of equal-length int32 arrays
+        """
+        return self.body_idx[:self.length], self.node_idx[:self.length]
+
+    def extend(self, bodies, nodes):
+        """
+        Queue (body, node) pairs for the next level.
+
+        Args:
+            bodies, nodes: equal-length integer arrays
+        """
+        end = self._next_length + len(bodies)
+        if end > len(self._next_body):
+            capacity = max(end, 2 * len(self._next_body))
+            self._next_body = np.resize(self._next_body, capacity)
+            self._next_node = np.resize(self._next_node, capacity)
+        self._next_body[self._next_length:end] = bodies
+        self._next_node[self._next_length:end] = nodes
+        self._next_length = end
+
+    def swap(self):
+        """Make the queued pairs the current level and start an empty next one."""
+        self.body_idx, self._next_body = self._next_body, self.body_idx
+        self.node_idx, self._next_node = self._next_node, self.node_idx
+        self.length, self._next_length = self._next_length, 0
+
+
+class QuadTree:
+    """
+    Quadtree stored as parallel arrays, one row per node.
+
+    Node 0 is the root and new nodes are taken from a bump allocator. For a
+    node n:
+        box[n]       = (x0, y0, x1, y1) bounds of the node
+        com[n]       = (m, x, y) centre of mass of the bodies below it
+        children[n]  = node indices of its [NE, NW, SW, SE] children, or -1 for a leaf
+        body[n]      = index of the first body held by a leaf, or -1
+        nbodies[n]   = number of bodies contained in the node
+    Bodies sharing a leaf at MAX_DEPTH are linked through next.
+    """
+
+    def __init__(self, box, m, x, y, capacity=None):
+        """
+        Initialize an empty QuadTree over a set of bodies.
+
+        Args:
+            box: Box object defining the root spatial region
+            m, x, y: (N,) float64 arrays of masses and positions; bodies are
+                     referred to by their index into these arrays
+            capacity: number of nodes to preallocate (default: 8N, grown as needed)
+        """
+        self.m, self.x, self.y = m, x, y
+        if capacity is None:
+            capacity = 8 * len(m)
+        capacity = max(capacity, 4 * MAX_DEPTH + 1)
+        self.box = np.empty((capacity, 4))
+        self.com = np.empty((capacity, 3))
+        self.children = np.empty((capacity, 4), dtype=np.int32)
+        self.body = np.empty(capacity, dtype=np.int32)
+        self.nbodies = np.empty(capacity, dtype=np.int32)
+        self.next = np.full(len(m), -1, dtype=np.int32)
+        self.box[0] = (box.x0, box.y0, box.x1, box.y1)
+        self.com[0] = 0.0
+        self.children[0] = -1
+        self.body[0] = -1
+        self.nbodies[0] = 0
+        self.count = 1    # number of allocated nodes
+        self.size = 0     # number of bodies added
+
+    def _grow(self):
+        """Double the node capacity, keeping the allocated nodes."""
+        capacity = 2 * self.box.shape[0]
+        for name in ('box', 'com', 'children', 'body', 'nbodies'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _arrays(self):
+        """Arguments shared by the compiled build functions."""
+        return (self.m, self.x, self.y, self.box, self.com, self.children,
+                self.body, self.next, self.nbodies)
+
+    def add(self, i):
+        """
+        Add body i to this QuadTree.
+
+        Args:
+            i: index of the body in the m, x, y arrays
+        """
+        if self.count + 4 * MAX_DEPTH > self.box.shape[0]:
+            self._grow()
+        self.count = _insert(i, *self._arrays(), self.count)
+        self.size += 1
+
+    def addAll(self):
+        """Add every body in the m, x, y arrays, in index order."""
+        i = 0
+        while i < len(self.m):
+            i, self.count = _build(i, *self._arrays(), self.count)
+            if i < len(self.m):
+                self._grow()
+        self.size = len(self.m)
+
+    def getBodies(self):
+        """
+        Collect the indices of all bodies in this QuadTree.
+
+        Returns:
+            List of body indices contained in the tree
+        """
+        A = []
+        stack = [0]
+        while stack:
+            n = stack.pop()
+            if self.children[n, 0] < 0:
+                j = self.body[n]
+                while j >= 0:
+                    A.append(int(j))
+                    j = self.next[j]
+            else:
+                stack.extend(self.children[n].tolist())
+        return A
+
+    def interactions(self, i, theta, out=None):
+        """
+        Get the sources acting on body i under the Barnes-Hut criterion.
+
+        Args:
+            i: index of the target body
+            theta: opening angle
+            out: optional (N, 3) buffer to write into, reused across calls
+
+        Returns:
+            (k, 3) array of (m, x, y) rows: actual bodies, or the centre of
+            mass of a whole node that is far enough away
+        """
+        if out is None:
+            out = np.empty((len(self.m), 3))
+        k = _interactions(i, self.x[i], self.y[i], theta * theta, self.m, self.x, self.y,
+                          self.box, self.com, self.children, self.body, self.next,
+                          self.nbodies, out, np.empty(STACK_SIZE, np.int32))
+        return out[:k]
+
+    def accelerations(self, theta, eps2=0.0):
+        """
+        Get the Barnes-Hut acceleration on every body in the tree.
+
+        Equivalent to summing the force law over interactions(i, theta) for
+        each body i, without materializing the interaction lists.
+
+        Args:
+            theta: opening angle
+            eps2: squared softening length (default: 0)
+
+        Returns:
+            Tuple (ax, ay) of (N,) float64 arrays, not yet multiplied by G
+        """
+        if not NUMBA_AVAILABLE:
+            # Without Numba the per-body walk would run in the interpreter
+            return self.batchedAccelerations(theta, eps2)
+        ax = np.empty(len(self.m))
+        ay = np.empty(len(self.m))
+        _accelerations(theta * theta, eps2, self.m, self.x, self.y, self.box, self.com,
+                       self.children, self.body, self.next, self.nbodies, ax, ay)
+        return ax, ay
+
+    def batchedAccelerations(self, theta, eps2=0.0):
+        """
+        Get the same accelerations as accelerations() with a level-order sweep.
+
+        All bodies descend the tree together through a FrontierQueue, so each
+        level costs a handful of NumPy operations over the whole frontier
+        rather than one interpreted loop iteration per (body, node) pair.
+
+        Args:
+            theta: opening angle
+            eps2: squared softening length (default: 0)
+
+        Returns:
+            Tuple (ax, ay) of (N,) float64 arrays, not yet multiplied by G
+        """
+        N = len(self.m)
+        m, x, y = self.m, self.x, self.y
+        theta2 = theta * theta
+        ax = np.zeros(N)
+        ay = np.zeros(N)
+        queue = FrontierQueue(4 * N)
+        queue.extend(np.arange(N), np.zeros(N, dtype=np.int32))
+        queue.swap()
+
+        def accumulate(b, sm, sx, sy):
+            # Add the pull of sources (sm, sx, sy) on bodies b
+            dx = sx - x[b]
+            dy = sy - y[b]
+            r2 = dx * dx + dy * dy + eps2
+            f = np.zeros_like(r2)
+            np.divide(sm, r2 * np.sqrt(r2), out=f, where=r2 > 0)
+            ax[:] += np.bincount(b, dx * f, minlength=N)
+            ay[:] += np.bincount(b, dy * f, minlength=N)
+
+        while len(queue):
+            b, n = queue.current()
+            keep = self.nbodies[n] > 0
+            b, n = b[keep], n[keep]
+            leaf = self.children[n, 0] < 0
+            # Leaves: the bodies chained in them, except the target itself
+            lb = b[leaf]
+            j = self.body[n[leaf]]
+            while len(j):
+                real = j != lb
+                accumulate(lb[real], m[j[real]], x[j[real]], y[j[real]])
+                j = self.next[j]
+                more = j >= 0
+                lb, j = lb[more], j[more]
+            # Internal nodes: far enough away to use the centre of mass?
+            b, n = b[~leaf], n[~leaf]
+            box = self.box[n]
+            px, py = x[b], y[b]
+            inside = (box[:, 0] <= px) & (px <= box[:, 2]) & (box[:, 1] <= py) & (py <= box[:, 3])
+            com = self.com[n]
+            dx = com[:, 1] - px
+            dy = com[:, 2] - py
+            side = np.maximum(box[:, 2] - box[:, 0], box[:, 3] - box[:, 1])
+            accept = ~inside & (side * side < theta2 * (dx * dx + dy * dy))
+            accumulate(b[accept], com[accept, 0], com[accept, 1], com[accept, 2])
+            # Everything else is opened
+            b, n = b[~accept], n[~accept]
+            queue.extend(np.repeat(b, 4), self.children[n].ravel())
+            queue.swap()
+        return ax, ay
+
+    @staticmethod
+    def fromArrays(m, x, y):
+        """
+        Build a new QuadTree containing all bodies given as arrays.
+
+        Args:
+            m, x, y: (N,) float64 arrays of masses and positions
+
+        Returns:
+            QuadTree containing all bodies, or None if there are none
+        """
+        if len(m) == 0:
+            return None
+        t = QuadTree(Box.fromArrays(x, y), m, x, y)
+        t.addAll()
+        return t
@@ -2,16 +2,117 @@
 Simulation class for running n-body simulations.
 """
 
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.animation import FuncAnimation
+from matplotlib.lines import Line2D
+
+try:
+    from scipy.spatial.distance import pdist
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
 
+from nbody import _cuda, _kernels
 from nbody.body import Body
+from nbody.constants import G
+
+# Above this many pairs per frame, pdist's condensed distance matrix is too
+# large to materialize and closestDistance only tracks the running minimum
+PDIST_MAX_PAIRS = 1 << 24
+
+
+def _step(m, x, y, vx, vy, dt, eps2=0.0):
+    """
+    Advance all bodies by one timestep using broadcasted pairwise forces.
+
+    Same update rule as Body.next, but applied to Structure-of-Arrays state
+    so the O(n²) force loop runs inside NumPy instead of the interpreter.
+
+    Args:
+        m, x, y, vx, vy: (N,) float32 or float64 arrays of masses, positions and velocities
+        dt: time step in years
+        eps2: squared softening length; with eps2 > 0 the self pair has
+              dx = dy = 0 and contributes nothing on its own
+
+    Returns:
+        Tuple (x, y, vx, vy) of (N,) arrays after the timestep
+    """
+    # dx[i, j] is the x offset from body i to body j
+    dx = x[np.newaxis, :] - x[:, np.newaxis]
+    dy = y[np.newaxis, :] - y[:, np.newaxis]
+    r2 = dx * dx + dy * dy + eps2
+    # A body does not affect itself, and neither do coincident bodies each
+    # other: pairs at zero distance contribute nothing, as in every backend
+    inv_r3 = np.zeros_like(r2)
+    np.divide(1.0, r2 * np.sqrt(r2), out=inv_r3, where=r2 > 0)
+    ax = G * (m * dx * inv_r3).sum(axis=1)
+    ay = G * (m * dy * inv_r3).sum(axis=1)
+
+    return _advance(x, y, vx, vy, ax, ay, dt)
+
+
+def _min_sq_distance(positions):
+    """
+    Find the smallest squared distance between any two bodies over a trajectory.
+
+    Module-level so that closestDistance can hand chunks of frames to worker
+    processes.
+
+    Args:
+        positions: (T, N, k) array whose first two columns are (x, y), N >= 2
+
+    Returns:
+        Minimum squared distance over all frames and pairs
+    """
+    if SCIPY_AVAILABLE:
+        return min(pdist(state[:, :2], metric='sqeuclidean').min() for state in positions)
+    # Every unordered pair (i, j) with i < j
+    i, j = np.triu_indices(positions.shape[1], k=1)
+    min_sq_distance = float('inf')
+    for state in positions:
+        dx = state[i, 0] - state[j, 0]
+        dy = state[i, 1] - state[j, 1]
+        sq_distance = (dx * dx + dy * dy).min()
+        if sq_distance < min_sq_distance:
+            min_sq_distance = sq_distance
+    return min_sq_distance
+
+
+def _advance(x, y, vx, vy, ax, ay, dt):
+    """
+    Apply Body.next's semi-implicit Euler update to whole arrays.
+
+    Args:
+        x, y, vx, vy: (N,) arrays of positions and velocities
+        ax, ay: (N,) arrays of accelerations (including G)
+        dt: time step in years
+
+    Returns:
+        Tuple (x, y, vx, vy) of (N,) arrays after the timestep
+    """
+    vx_new = vx + dt * ax
+    vy_new = vy + dt * ay
+    return x + dt * vx_new, y + dt * vy_new, vx_new, vy_new
 
 
 class Simulation:
-    """Basic n-body simulation using direct force calculation."""
+    """
+    Basic n-body simulation using direct force calculation.
+
+    All backends apply the same force law; bodies at exactly the same
+    position exert no force on each other.
+    """
     
-    def __init__(self, Bodies, total_time=10, dt=0.01):
+    BACKENDS = ('auto', 'numpy', 'numba', 'python')
+    DEVICES = ('cpu', 'cuda')
+
+    def __init__(self, Bodies, total_time=10, dt=0.01, backend='auto', eps2=0.0, device='cpu',
+                 dtype=np.float64, n_jobs=1):
         """
         Initialize a simulation.
         
@@ -19,27 +120,176 @@ class Simulation:
             Bodies: list of Body objects to simulate
             total_time: total simulation time in years (default: 10)
             dt: time step in years (default: 0.01)
+            backend: force kernel to use, one of 'numpy', 'numba', 'python'
+                     (Body.next on Body objects, kept as a reference) or
+                     'auto' (numba when installed, else numpy) (default: 'auto')
+            eps2: squared Plummer softening length in AU², added to every
+                  squared distance in the force law; e.g. SOFTENING2 keeps
+                  close encounters finite (default: 0, the exact Newtonian
+                  force of Body.next)
+            device: 'cpu', or 'cuda' to run the force kernel on the GPU with
+                    CuPy, in which case run() returns a cupy.ndarray
+                    (default: 'cpu')
+            dtype: floating point type of the state and trajectory arrays;
+                   np.float32 halves memory traffic at plotting-level
+                   precision. The CUDA kernel always uses float64
+                   (default: np.float64)
+            n_jobs: number of worker processes closestDistance splits the
+                    frames across, or -1 for one per CPU. Starting workers
+                    costs about a second, so this only pays off for long
+                    trajectories, and scripts must guard their entry point
+                    with if __name__ == '__main__' (default: 1, serial)
         """
-        self.bodies = Bodies
+        if backend not in Simulation.BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {Simulation.BACKENDS}")
+        if backend == 'numba' and not _kernels.NUMBA_AVAILABLE:
+            raise ImportError("backend='numba' requires numba to be installed")
+        if device not in Simulation.DEVICES:
+            raise ValueError(f"Unknown device {device!r}, expected one of {Simulation.DEVICES}")
+        if device == 'cuda' and not _cuda.CUPY_AVAILABLE:
+            raise ImportError("device='cuda' requires cupy to be installed")
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"dtype must be float32 or float64, got {dtype}")
+        if eps2 < 0:
+            raise ValueError(f"eps2 must be non-negative, got {eps2}")
+        if backend == 'python' and eps2 != 0:
+            raise ValueError("backend='python' uses Body.next, which does not support eps2")
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs < 1:
+            raise ValueError(f"n_jobs must be positive or -1, got {n_jobs}")
+        self._bodies = Bodies
         self.total_time = total_time
         self.dt = dt
         self.timesteps = int(total_time / dt)
-        
+        self.backend = backend
+        self.eps2 = eps2
+        self.device = device
+        self.dtype = dtype
+        self.n_jobs = n_jobs
+        # Structure-of-Arrays copy of the initial Bodies: (N,) masses and
+        # (N, 4) rows of (x, y, vx, vy)
+        initial = np.array([p.asTuple() for p in Bodies], dtype=np.float64).reshape(-1, 5)
+        self.mass = initial[:, 0].astype(dtype)
+        self.state = initial[:, 1:].astype(dtype)
+
+    @classmethod
+    def fromArrays(cls, mass, x, y, vx=None, vy=None, **kwargs):
+        """
+        Initialize a simulation directly from Structure-of-Arrays state.
+
+        No Body objects are created; self.bodies is only built if it is used.
+
+        Args:
+            mass, x, y: (N,) arrays of masses and positions
+            vx, vy: (N,) arrays of velocities (default: at rest)
+            **kwargs: remaining options of the constructor (total_time, dt, ...)
+
+        Returns:
+            New simulation of the given bodies
+        """
+        mass = np.asarray(mass, dtype=np.float64)
+        zeros = np.zeros_like(mass)
+        columns = [np.asarray(c, dtype=np.float64) if c is not None else zeros
+                   for c in (x, y, vx, vy)]
+        if any(c.shape != mass.shape or c.ndim != 1 for c in columns):
+            raise ValueError("mass, x, y, vx and vy must be 1-D arrays of the same length")
+        sim = cls([], **kwargs)
+        sim._bodies = None
+        sim.mass = mass.astype(sim.dtype)
+        sim.state = np.stack(columns, axis=1).astype(sim.dtype)
+        return sim
+
+    @property
+    def bodies(self):
+        """The initial Bodies; built from the arrays on first use after fromArrays."""
+        if self._bodies is None:
+            self._bodies = self.asBodies()
+        return self._bodies
+
+    def _unpack(self):
+        """
+        Split the initial state into Structure-of-Arrays form.
+
+        Returns:
+            Tuple (m, x, y, vx, vy) of (N,) arrays of self.dtype
+        """
+        x, y, vx, vy = self.state.T.copy()
+        return self.mass, x, y, vx, vy
+
+    def asBodies(self, state=None):
+        """
+        Materialize one timestep of the trajectory as Body objects.
+
+        Args:
+            state: (N, 4) array of (x, y, vx, vy) rows, e.g. run()[t]
+                   (default: the initial state)
+
+        Returns:
+            List of Body objects
+        """
+        if state is None:
+            state = self.state
+        return [Body(m, *row) for m, row in zip(self.mass.tolist(), state.tolist())]
+
+    @staticmethod
+    def _toHost(pss):
+        """Copy a trajectory returned by run() back to host memory if needed."""
+        if _cuda.CUPY_AVAILABLE:
+            return _cuda.cp.asnumpy(pss)
+        return pss
+
+    def _stepFunction(self):
+        """Return the single-timestep kernel selected by self.backend."""
+        if self.backend == 'numba' or (self.backend == 'auto' and _kernels.NUMBA_AVAILABLE):
+            return _kernels.step
+        return _step
+
+    def _runBodies(self):
+        """
+        Run the simulation with Body.next on Body objects.
+
+        Pure-Python fallback for backend='python'; same result layout as run().
+        """
+        N = len(self.mass)
+        dt = self.dt
+        bodies_t = self.asBodies()
+        pss = np.empty((self.timesteps + 1, N, 4), dtype=self.dtype)
+        pss[0] = self.state
+        for t in range(self.timesteps):
+            # For every Body in the current timestep, add its next position in next timestep
+            bodies_t = [bodies_t[i].next(bodies_t, dt) for i in range(N)]
+            for i, p in enumerate(bodies_t):
+                pss[t + 1, i] = (p.x, p.y, p.vx, p.vy)
+        return pss
+
     def run(self):
         """
-        Run the simulation and produce an array of arrays of Bodies.
+        Run the simulation and produce the trajectory of all Bodies.
         
-        The t-th entry in the list is the position of Bodies after the t-th timestep
+        The t-th entry is the state of the Bodies after the t-th timestep
         has been simulated.
         
         Returns:
-            List of lists, where each inner list contains Body objects at that timestep
+            (timesteps + 1, N, 4) array, where entry [t, i] holds the
+            (x, y, vx, vy) of body i at timestep t; masses are in self.mass.
+            With device='cuda' this is a cupy.ndarray in GPU memory.
         """
-        pss = [None] * (self.timesteps + 1)
-        pss[0] = self.bodies
+        if self.device == 'cuda':
+            return _cuda.run(self.mass, self.state, self.timesteps, self.dt, self.eps2)
+        if self.backend == 'python':
+            return self._runBodies()
+        step = self._stepFunction()
+        m, x, y, vx, vy = self._unpack()
+        pss = np.empty((self.timesteps + 1, len(m), 4), dtype=self.dtype)
+        pss[0] = self.state
         for t in range(self.timesteps):
-            # For every Body in the current timestep, add its next position in next timestep
-            pss[t + 1] = [pss[t][i].next(pss[t], self.dt) for i in range(len(self.bodies))]
+            x, y, vx, vy = step(m, x, y, vx, vy, self.dt, self.eps2)
+            pss[t + 1, :, 0] = x
+            pss[t + 1, :, 1] = y
+            pss[t + 1, :, 2] = vx
+            pss[t + 1, :, 3] = vy
         return pss
     
     def closestDistance(self):
@@ -49,22 +299,27 @@ class Simulation:
         Returns:
             Minimum distance between any two bodies over all timesteps
         """
-        if len(self.bodies) < 2:
+        if len(self.mass) < 2:
             return None
 
-        positions = self.run()
-
-        min_sq_distance = float('inf')
-
-        for timestep_bodies in positions:
-            for i in range(len(timestep_bodies)):
-                for j in range(i + 1, len(timestep_bodies)):
-                    sq_distance = timestep_bodies[i].squareDist(timestep_bodies[j])
+        positions = self._toHost(self.run())
 
-                    if sq_distance < min_sq_distance:
-                        min_sq_distance = sq_distance
+        n = len(self.mass)
+        if n * (n - 1) // 2 > PDIST_MAX_PAIRS and _kernels.NUMBA_AVAILABLE:
+            min_sq_distance = _kernels.min_sq_distance(positions)
+        elif self.n_jobs > 1 and len(positions) > 1:
+            # Frames are independent: take the minimum of each chunk in its
+            # own process, then the minimum of those. Workers are spawned
+            # rather than forked: forking after Numba has started its thread
+            # pool can deadlock.
+            chunks = np.array_split(positions, min(self.n_jobs, len(positions)))
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(chunks), mp_context=context) as executor:
+                min_sq_distance = min(executor.map(_min_sq_distance, chunks))
+        else:
+            min_sq_distance = _min_sq_distance(positions)
 
-        return min_sq_distance ** 0.5
+        return float(min_sq_distance) ** 0.5
     
     def show(self, x0, y0, x1, y1):
         """
@@ -74,16 +329,17 @@ class Simulation:
             x0, y0: lower-left corner of view window
             x1, y1: upper-right corner of view window
         """
-        pss = self.run()
+        pss = self._toHost(self.run())
         # Get figure and axes objects
         fig, ax = plt.subplots()
         # Set some reasonable zoom on axes
         ax.set_xlim(x0, x1)
         ax.set_ylim(y0, y1)
-        # Put labels on the window for Bodies with different colours
-        scatter = []
-        for i in range(len(self.bodies)):
-            scatter.append(ax.scatter([], [], marker='o', label=f'Body {i}'))
+        # Draw all Bodies as one collection, each in its own colour from the
+        # default cycle, with a legend entry per Body
+        colours = [f'C{i % 10}' for i in range(len(self.mass))]
+        scatter = ax.scatter(pss[0, :, 0], pss[0, :, 1], c=colours, marker='o')
+        handles = [Line2D([], [], marker='o', linestyle='none', color=c) for c in colours]
         # Add timestep text to the legend
         time_text = ax.text(0.02, 0.98, '', transform=ax.transAxes, 
                            verticalalignment='top', 
@@ -91,15 +347,15 @@ class Simulation:
                                    facecolor='wheat', alpha=0.5))
         # Update function from one position to the next
         def update(frame):
-            for i in range(len(self.bodies)):
-                scatter[i].set_offsets([pss[frame][i].x, pss[frame][i].y])
+            scatter.set_offsets(pss[frame, :, 0:2])
             time_text.set_text(f'Timestep: {frame}')                
-            return scatter + [time_text]
+            return [scatter, time_text]
         # Generate and show the animation
         a = FuncAnimation(fig, update, frames=len(pss), interval=1, blit=True, repeat=False)
         plt.xlabel("X coordinate (AU)")
         plt.ylabel("Y coordinate (AU)")
         plt.title("Celestial body trajectories")
-        plt.legend()
+        if handles:
+            plt.legend(handles, [f'Body {i}' for i in range(len(handles))])
         plt.show()
 
@@ -1,37 +1,76 @@
 """
 Stack data structure for tree traversal.
+
+Deprecated: the traversals in this package use a plain list (append, pop and
+truthiness) in Python code and stack_nb in compiled code. Stack is kept for
+compatibility with existing scripts.
 """
 
+import warnings
+
+import numpy as np
+
 
 class Stack:
-    """Simple stack implementation using a list."""
-    
-    def __init__(self):
-        """Initialize an empty stack."""
-        self.inList = []
-        
+    """
+    Stack of integer indices (e.g. node numbers of a QuadTree) backed by a
+    preallocated NumPy array and a top pointer.
+
+    Compiled code keeps the same (buf, top) pair itself, through the functions
+    in stack_nb; this class indexes the buffer directly, since calling into
+    Numba from the interpreter costs more than the push or pop.
+    """
+
+    def __init__(self, capacity=64):
+        """
+        Initialize an empty stack.
+
+        Args:
+            capacity: number of elements to preallocate; the buffer doubles
+                      when it fills up (default: 64, deeper than any quadtree
+                      traversal needs)
+        """
+        warnings.warn("Stack is deprecated; use a list, or stack_nb in compiled code",
+                      DeprecationWarning, stacklevel=2)
+        self.buf = np.empty(max(capacity, 1), dtype=np.intp)
+        self.top = 0
+
     def push(self, v):
-        """Push an element onto the stack."""
-        self.inList.append(v)
+        """
+        Push an integer onto the stack.
+
+        Raises:
+            TypeError: if v is not an integer
+        """
+        if not isinstance(v, (int, np.integer)):
+            raise TypeError(f"Stack holds integer indices, got {type(v).__name__}")
+        if self.top == len(self.buf):
+            self.buf = np.resize(self.buf, 2 * len(self.buf))
+        self.buf[self.top] = v
+        self.top += 1
 
     def pop(self):
-        """Pop and return the top element from the stack."""
-        if len(self.inList) == 0:
+        """
+        Pop and return the top element from the stack.
+
+        Popping an empty stack raises an Exception only when assertions are
+        enabled; under python -O the check is compiled out and the result is
+        undefined, so callers should test the stack for truth first.
+        """
+        if __debug__ and self.top == 0:
             raise Exception("Popping from an empty stack")
-        return self.inList.pop()
-    
+        self.top -= 1
+        return int(self.buf[self.top])
+
     def isEmpty(self):
         """Check if the stack is empty."""
-        return len(self.inList) == 0
-    
-    def size(self):
-        """Return the size of the stack."""
-        return len(self.inList)
-
-    def toArray(self):
-        """Return the stack as an array."""
-        return self.inList
-    
-    def __str__(self):
-        return str(self.inList)
+        return self.top == 0
 
+    def __len__(self):
+        return self.top
+
+    def __bool__(self):
+        return self.top > 0
+
+    def __str__(self):
+        return str(self.buf[:self.top].tolist())
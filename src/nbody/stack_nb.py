@@ -0,0 +1,35 @@
+"""
+Stack operations on a plain (buf, top) pair, so compiled traversals can keep
+an explicit stack without any Python objects.
+
+buf is a 1-D integer array and top the number of elements in use. The
+functions return the new top, which the caller keeps in a local variable.
+"""
+
+from nbody._kernels import njit
+
+
+@njit(cache=True)
+def push(buf, top, v):
+    """
+    Push v onto the stack.
+
+    The caller guarantees top < len(buf); the buffer is never grown.
+
+    Returns:
+        The new top
+    """
+    buf[top] = v
+    return top + 1
+
+
+@njit(cache=True)
+def pop(buf, top):
+    """
+    Pop the top element from a non-empty stack.
+
+    Returns:
+        Tuple (element, new top)
+    """
+    top -= 1
+    return buf[top], top
@@ -0,0 +1,12 @@
+"""
+The 9x9 grid of unit masses 2 AU apart from the question, shared by the tests.
+"""
+
+import numpy as np
+
+# Built once as arrays in the same order as Body(1, 2*x, 2*y) for y in range(9)
+# for x in range(9). Simulation.fromArrays and QuadTree.fromArrays copy them, so
+# they can be shared. Many bodies lie exactly on the lines where the root box of
+# a QuadTree and its children are split.
+GRID_X, GRID_Y = (a.ravel() for a in np.meshgrid(np.arange(9) * 2.0, np.arange(9) * 2.0))
+GRID_MASS = np.ones(81)
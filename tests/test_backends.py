@@ -0,0 +1,164 @@
+"""
+Tests that the Simulation backends produce the same trajectories.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Try importing directly first (if package is installed)
+try:
+    from nbody import Body, FastSimulation, Simulation
+    from nbody._cuda import CUPY_AVAILABLE
+    from nbody._kernels import NUMBA_AVAILABLE
+    from nbody.constants import G, GREEN, RED, YELLOW, END
+except ImportError:
+    # If not installed, add src to path
+    test_dir = Path(__file__).parent
+    src_dir = test_dir.parent / 'src'
+    sys.path.insert(0, str(src_dir))
+    from nbody import Body, FastSimulation, Simulation
+    from nbody._cuda import CUPY_AVAILABLE
+    from nbody._kernels import NUMBA_AVAILABLE
+    from nbody.constants import G, GREEN, RED, YELLOW, END
+
+# Import the test runner and the 9x9 grid shared by the tests
+from test_runner import run_tests
+from grid import GRID_MASS, GRID_X, GRID_Y
+
+# Backends to compare against 'numpy'; numba is optional
+_BACKENDS = ('python', 'numba') if NUMBA_AVAILABLE else ('python',)
+
+
+def _compare_backends(make):
+    """
+    Run the simulation built by make(backend) with every backend.
+
+    Returns:
+        List of failure messages, empty if all backends agree with 'numpy'
+    """
+    expected = make('numpy').run()
+    failures = []
+    if not np.isfinite(expected).all():
+        failures.append("numpy trajectory is not finite")
+    for backend in _BACKENDS:
+        result = make(backend).run()
+        error = np.abs(result - expected).max()
+        if not error < 1e-9:
+            failures.append(f"{backend} differs from numpy by up to {error}")
+    return failures
+
+
+def test_grid_backends_agree():
+    """Test that the numpy, numba and python backends agree on the grid."""
+    # The grid collapses into close encounters around t = 0.5, after which
+    # rounding differences between backends are amplified; stop before that
+    failures = _compare_backends(lambda backend: Simulation.fromArrays(
+        GRID_MASS, GRID_X, GRID_Y, total_time=0.3, dt=0.01, backend=backend))
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_coincident_bodies():
+    """Test that coincident bodies exert no force on each other in every backend."""
+    bodies = [Body(1, 0, 0), Body(1, 0, 0), Body(1, 3, 4)]
+    failures = _compare_backends(lambda backend: Simulation(
+        bodies, total_time=0.1, dt=0.01, backend=backend))
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_float32_matches_float64():
+    """Test that float32 trajectories agree with float64 to float32 precision."""
+    failures = []
+    for backend in ('numpy',) + _BACKENDS[1:]:
+        expected = Simulation.fromArrays(GRID_MASS, GRID_X, GRID_Y, total_time=0.1,
+                                         backend=backend).run()
+        result = Simulation.fromArrays(GRID_MASS, GRID_X, GRID_Y, total_time=0.1,
+                                       backend=backend, dtype=np.float32).run()
+        if result.dtype != np.float32:
+            failures.append(f"{backend} returned {result.dtype}")
+        # float32 carries about 7 significant digits of coordinates up to 16 AU
+        error = np.abs(result - expected).max()
+        if not error < 1e-4:
+            failures.append(f"{backend} float32 differs from float64 by up to {error}")
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_softening():
+    """Test that eps2 softens the force law the same way in every backend."""
+    eps2 = 0.25
+    dt = 0.01
+    failures = []
+    # Two unit masses 1 AU apart: after one kick the first moves towards the
+    # second at dt * G / (1 + eps2)^1.5
+    expected_vx = dt * G / (1 + eps2) ** 1.5
+    for backend in ('numpy',) + _BACKENDS[1:]:
+        sim = Simulation([Body(1, 0, 0), Body(1, 1, 0)], total_time=dt, dt=dt,
+                         backend=backend, eps2=eps2)
+        vx = sim.run()[1, 0, 2]
+        if not abs(vx - expected_vx) < 1e-12 * expected_vx:
+            failures.append(f"{backend}: expected vx {expected_vx}, got {vx}")
+    # On the grid, the direct backends and the exact (theta = 0) tree agree
+    direct = Simulation.fromArrays(GRID_MASS, GRID_X, GRID_Y, total_time=0.3, eps2=eps2,
+                                   backend='numpy').run()
+    sims = [Simulation.fromArrays(GRID_MASS, GRID_X, GRID_Y, total_time=0.3, eps2=eps2,
+                                  backend=backend) for backend in _BACKENDS[1:]]
+    tree = FastSimulation.fromArrays(GRID_MASS, GRID_X, GRID_Y, total_time=0.3, eps2=eps2,
+                                     algorithm='tree')
+    tree.theta = 0.0
+    for sim in sims + [tree]:
+        error = np.abs(sim.run() - direct).max()
+        if not error < 1e-9:
+            failures.append(f"{type(sim).__name__}({sim.backend}) differs by up to {error}")
+    try:
+        Simulation([], backend='python', eps2=eps2)
+        failures.append("backend='python' accepted eps2")
+    except ValueError:
+        pass
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_cuda_matches_numpy():
+    """Test that device='cuda' gives the numpy trajectory (skipped without CuPy)."""
+    if not CUPY_AVAILABLE:
+        return True, f"{YELLOW}   - Skipped: CuPy is not installed{END}"
+    cases = (
+        ("grid", lambda **kwargs: Simulation.fromArrays(GRID_MASS, GRID_X, GRID_Y,
+                                                        total_time=0.3, **kwargs)),
+        ("coincident", lambda **kwargs: Simulation([Body(1, 0, 0), Body(1, 0, 0), Body(1, 3, 4)],
+                                                   total_time=0.1, **kwargs)),
+        ("softened grid", lambda **kwargs: Simulation.fromArrays(GRID_MASS, GRID_X, GRID_Y,
+                                                                 total_time=0.3, eps2=0.25, **kwargs)),
+    )
+    failures = []
+    for name, make in cases:
+        expected = make(backend='numpy').run()
+        result = make(device='cuda').run().get()
+        error = np.abs(result - expected).max()
+        if not error < 1e-9:
+            failures.append(f"{name}: cuda differs from numpy by up to {error}")
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+if __name__ == "__main__":
+    run_tests(test_name_prefix="Testing Simulation backends")
@@ -0,0 +1,153 @@
+"""
+Tests for FastSimulation and the QuadTree it is built on.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Try importing directly first (if package is installed)
+try:
+    from nbody import FastSimulation, QuadTree, Simulation
+    from nbody.constants import GREEN, RED, END
+except ImportError:
+    # If not installed, add src to path
+    test_dir = Path(__file__).parent
+    src_dir = test_dir.parent / 'src'
+    sys.path.insert(0, str(src_dir))
+    from nbody import FastSimulation, QuadTree, Simulation
+    from nbody.constants import GREEN, RED, END
+
+# Import the test runner and the 9x9 grid shared by the tests
+from test_runner import run_tests
+from grid import GRID_MASS, GRID_X, GRID_Y
+
+
+def _random_bodies(n, seed=0):
+    """Random masses and positions, with the first two bodies coincident."""
+    rng = np.random.default_rng(seed)
+    m = rng.uniform(1, 5, n)
+    x = rng.uniform(-50, 50, n)
+    y = rng.uniform(-50, 50, n)
+    x[1], y[1] = x[0], y[0]
+    return m, x, y
+
+
+def _sum_interactions(tree, theta):
+    """Accelerations (without G) summed over QuadTree.interactions, body by body."""
+    N = len(tree.m)
+    ax = np.zeros(N)
+    ay = np.zeros(N)
+    for i in range(N):
+        ps = tree.interactions(i, theta)
+        dx = ps[:, 1] - tree.x[i]
+        dy = ps[:, 2] - tree.y[i]
+        r2 = dx * dx + dy * dy
+        # Coincident bodies exert no force on each other
+        f = np.divide(ps[:, 0], r2 * np.sqrt(r2), out=np.zeros_like(r2), where=r2 > 0)
+        ax[i] = (dx * f).sum()
+        ay[i] = (dy * f).sum()
+    return ax, ay
+
+
+def test_exact_tree_matches_simulation():
+    """Test that with theta = 0 the tree gives the direct Simulation trajectory."""
+    rng = np.random.default_rng(1)
+    vx, vy = rng.uniform(-1, 1, (2, 81))
+    direct = Simulation.fromArrays(GRID_MASS, GRID_X, GRID_Y, vx, vy, total_time=0.1)
+    fast = FastSimulation.fromArrays(GRID_MASS, GRID_X, GRID_Y, vx, vy, total_time=0.1,
+                                     algorithm='tree')
+    fast.theta = 0.0
+    expected = direct.run()
+    result = fast.run()
+    error = np.abs(result - expected).max()
+    try:
+        assert result.shape == expected.shape, f"   Expected shape {expected.shape}, got {result.shape}"
+        assert error < 1e-9, f"   Trajectories differ by up to {error}"
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_get_bodies_once():
+    """Test that QuadTree.getBodies returns every body exactly once."""
+    m, x, y = _random_bodies(200)
+    # Also stack several bodies on one point, deep enough to hit MAX_DEPTH
+    m = np.concatenate([m, GRID_MASS, np.ones(5)])
+    x = np.concatenate([x, GRID_X, np.full(5, 8.0)])
+    y = np.concatenate([y, GRID_Y, np.full(5, 8.0)])
+    tree = QuadTree.fromArrays(m, x, y)
+    result = sorted(tree.getBodies())
+    try:
+        assert result == list(range(len(m))), "   getBodies() missed or repeated bodies"
+        assert tree.size == len(m), f"   Expected size {len(m)}, got {tree.size}"
+        assert tree.nbodies[0] == len(m), f"   Root holds {tree.nbodies[0]} bodies, expected {len(m)}"
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_interactions_match_accelerations():
+    """Test that accelerations() sums the force law over interactions()."""
+    failures = []
+    for name, (m, x, y) in (("random", _random_bodies(300)), ("grid", (GRID_MASS, GRID_X, GRID_Y))):
+        tree = QuadTree.fromArrays(m, x, y)
+        for theta in (0.0, 0.7):
+            ax, ay = tree.accelerations(theta)
+            ex, ey = _sum_interactions(tree, theta)
+            scale = max(np.abs(ex).max(), np.abs(ey).max())
+            error = max(np.abs(ax - ex).max(), np.abs(ay - ey).max()) / scale
+            if not error < 1e-12:
+                failures.append(f"{name} theta={theta}: relative error {error}")
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_batched_matches_accelerations():
+    """Test that the level-order batchedAccelerations agrees with accelerations()."""
+    failures = []
+    cases = (("random", _random_bodies(300)), ("grid", (GRID_MASS, GRID_X, GRID_Y)),
+             ("three", _random_bodies(3, seed=2)))
+    for name, (m, x, y) in cases:
+        tree = QuadTree.fromArrays(m, x, y)
+        for theta in (0.0, 0.7):
+            for eps2 in (0.0, 1e-4):
+                ax, ay = tree.accelerations(theta, eps2)
+                bx, by = tree.batchedAccelerations(theta, eps2)
+                scale = max(np.abs(ax).max(), np.abs(ay).max())
+                error = max(np.abs(bx - ax).max(), np.abs(by - ay).max()) / scale
+                if not error < 1e-12:
+                    failures.append(f"{name} theta={theta} eps2={eps2}: relative error {error}")
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_python_backend_stays_dense():
+    """Test that backend='python' runs Body.next above the crossover and rejects the tree."""
+    m, x, y = _random_bodies(FastSimulation.DENSE_MAX_N + 1)
+    expected = Simulation.fromArrays(m, x, y, total_time=0.01, backend='python').run()
+    fast = FastSimulation.fromArrays(m, x, y, total_time=0.01, backend='python')
+    result = fast.run()
+    try:
+        assert np.array_equal(result, expected), "   algorithm='auto' did not use Body.next"
+        for run in (lambda: FastSimulation.fromArrays(m, x, y, backend='python', algorithm='tree'),
+                    lambda: fast.run(test=[None] * len(m))):
+            try:
+                run()
+                assert False, "   Expected ValueError for the tree with backend='python'"
+            except ValueError:
+                pass
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+if __name__ == "__main__":
+    run_tests(test_name_prefix="Testing FastSimulation and QuadTree")
@@ -4,6 +4,12 @@ Common test runner framework for consistent test output formatting.
 Test files should define test functions with names starting with 'test_'.
 Each test function should return a tuple: (success: bool, message: str)
 
+Tests run in parallel worker processes, so the entry point must be guarded
+by if __name__ == "__main__". Pass --serial on the command line (or
+serial=True) to run them one after another in the calling process instead;
+this also happens automatically when the workers cannot import the tests.
+Anything a test prints is captured and shown under that test in the report.
+
 Usage:
     from tests.test_runner import run_tests
     
@@ -15,29 +21,41 @@ Usage:
         run_tests()
 """
 
+import contextlib
 import inspect
+import io
+import multiprocessing
+import operator
+import os
+import pickle
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Callable, Dict, Tuple
-import time
+from typing import Callable, Dict, List, Optional, Tuple
+from time import perf_counter_ns
 
 # Try importing directly first (if package is installed)
 try:
-    from nbody.misc import time_function
     from nbody.constants import GREEN, RED, YELLOW, END
 except ImportError:
     # If not installed, add src to path
     test_dir = Path(__file__).parent
     src_dir = test_dir.parent / 'src'
     sys.path.insert(0, str(src_dir))
-    from nbody.misc import time_function
     from nbody.constants import GREEN, RED, YELLOW, END
 
 
+# Discovered (name, function) lists, keyed by id() of the test module
+_DISCOVERY_CACHE: Dict[int, list] = {}
+
+
 def discover_tests(module=None):
     """
     Discover all test functions in the calling module, preserving definition order.
     
+    The result is cached per module, so repeated calls do not rescan it.
+    
     Args:
         module: The module to search for tests. If None, uses the calling module.
     
@@ -45,30 +63,116 @@ def discover_tests(module=None):
         List of (test_name, test_function) tuples, sorted by definition line number.
     """
     if module is None:
-        # Get the calling module (the test file that called run_tests)
+        # Get the calling module (the test file that called discover_tests)
         frame = inspect.currentframe()
         try:
-            # Go back 2 frames: skip discover_tests and run_tests
-            caller_frame = frame.f_back.f_back
-            module = inspect.getmodule(caller_frame)
+            module = inspect.getmodule(frame.f_back)
         finally:
             del frame
     
+    cached = _DISCOVERY_CACHE.get(id(module))
+    if cached is not None:
+        return list(cached)
+    
     tests = []
-    for name, obj in inspect.getmembers(module, inspect.isfunction):
-        if name.startswith('test_'):
+    # Check the cheap name test first so imported modules and helpers are
+    # skipped without inspecting them
+    for name, obj in vars(module).items():
+        if name.startswith('test_') and inspect.isfunction(obj):
             # Get the line number where the function is defined
             line_no = obj.__code__.co_firstlineno
             tests.append((line_no, name, obj))
     
     # Sort by line number to preserve definition order
-    tests.sort(key=lambda x: x[0])
+    tests.sort(key=operator.itemgetter(0))
     
     # Return list of (name, function) tuples in definition order
-    return [(name, func) for _, name, func in tests]
+    tests = [(name, func) for _, name, func in tests]
+    _DISCOVERY_CACHE[id(module)] = tests
+    return list(tests)
+
+
+def _warm_up():
+    """
+    Step two bodies once, so that importing nbody and loading the compiled
+    step from the Numba cache is not timed as part of the first test.
+    """
+    import numpy as np
+    from nbody import _kernels
+    zeros = np.zeros(2)
+    _kernels.step(np.ones(2), np.array([0.0, 1.0]), zeros, zeros, zeros, 0.01)
+
+
+def _init_worker():
+    """
+    Limit each worker process to a single Numba thread, then warm it up.
+    
+    The workers already run one test per core, so letting every one of them
+    start a full-size parallel thread pool would oversubscribe the machine
+    and distort the reported timings.
+    """
+    try:
+        import numba
+    except ImportError:
+        pass
+    else:
+        numba.set_num_threads(1)
+    _warm_up()
+
+
+def _invoke(test_func: Callable) -> Tuple[bool, str, Optional[int], str]:
+    """
+    Run and time a single test function, capturing what it prints.
+    
+    Module-level so that it can be sent to worker processes.
+    
+    Args:
+        test_func: The test function to run.
+    
+    Returns:
+        Tuple (success, status message, elapsed nanoseconds, printed output).
+        If the test raised, the message describes the exception and the time
+        is None.
+    """
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            t0 = perf_counter_ns()
+            result, status = test_func()
+            elapsed_ns = perf_counter_ns() - t0
+    except Exception as e:
+        return False, f"{RED}   ✗ Failed with exception: {e}{END}", None, output.getvalue()
+    return result, status, elapsed_ns, output.getvalue()
+
+
+def _run_parallel(test_funcs: List[Callable], workers: int) -> Optional[list]:
+    """
+    Run test functions in worker processes.
+    
+    Args:
+        test_funcs: The test functions to run.
+        workers: Number of worker processes.
+    
+    Returns:
+        List of _invoke results in the order of test_funcs, or None if the
+        tests could not be sent to the workers (e.g. they were defined in a
+        __main__ the workers cannot import).
+    """
+    # Workers are spawned rather than forked, as forking is unsafe once Numba
+    # has started its threads
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker) as executor:
+            return list(executor.map(_invoke, test_funcs))
+    except (BrokenProcessPool, pickle.PicklingError, AttributeError, TypeError):
+        # _invoke catches exceptions raised by the tests themselves, so these
+        # come from pickling the test functions or starting the workers
+        return None
 
 
-def run_tests(test_name_prefix: str = "Testing", module=None, run_only: list = None) -> Dict[str, bool]:
+def run_tests(test_name_prefix: str = "Testing", module=None, run_only: list = None,
+              serial: bool = None) -> Dict[str, bool]:
     """
     Run all test functions discovered in the calling module and format output.
     
@@ -77,10 +181,20 @@ def run_tests(test_name_prefix: str = "Testing", module=None, run_only: list = N
         module: The module to search for tests. If None, uses the calling module.
         run_only: Optional list of test function names to run. If None, runs all tests.
                   Can be specified with or without 'test_' prefix (e.g., ['no_bodies', 'test_one_body']).
+        serial: Run the tests one at a time in this process, for tests that share
+                state. If None, runs serially only when --serial is on the command line.
     
     Returns:
         Dictionary mapping test names to their success status.
     """
+    if module is None:
+        # Get the calling module (the test file that called run_tests)
+        frame = inspect.currentframe()
+        try:
+            module = inspect.getmodule(frame.f_back)
+        finally:
+            del frame
+    
     tests = discover_tests(module)
     
     if not tests:
@@ -120,14 +234,6 @@ def run_tests(test_name_prefix: str = "Testing", module=None, run_only: list = N
             return {}
     
     # Get the module name for display
-    if module is None:
-        frame = inspect.currentframe()
-        try:
-            caller_frame = frame.f_back
-            module = inspect.getmodule(caller_frame)
-        finally:
-            del frame
-    
     module_name = module.__name__ if module else "tests"
     test_suite_name = getattr(module, '__doc__', None) or module_name
     
@@ -140,8 +246,25 @@ def run_tests(test_name_prefix: str = "Testing", module=None, run_only: list = N
     test_order = []  # Preserve the order tests were run
     test_number = 1
     
-    # Run each test with timing (tests are already in definition order)
-    for test_name, test_func in tests:
+    if serial is None:
+        serial = '--serial' in sys.argv
+    # Workers find the test functions by importing their module, which is
+    # impossible for a __main__ read from stdin, a REPL or a notebook
+    importable = module is not None and (module.__name__ != '__main__' or
+                                         getattr(module, '__file__', None))
+    workers = min(len(tests), os.cpu_count() or 1)
+    test_funcs = [test_func for _, test_func in tests]
+    outcomes = None
+    if not serial and importable and workers >= 2:
+        # Each test runs its own Simulation, so they are independent
+        outcomes = _run_parallel(test_funcs, workers)
+    if outcomes is None:
+        _warm_up()
+        outcomes = map(_invoke, test_funcs)
+    
+    # Report each test with its output and timing (tests are already in
+    # definition order)
+    for (test_name, test_func), (result, status, elapsed_ns, output) in zip(tests, outcomes):
         test_order.append(test_name)  # Track order
         # Get test docstring or use function name
         test_description = test_func.__doc__ or test_name.replace('_', ' ').title()
@@ -149,15 +272,13 @@ def run_tests(test_name_prefix: str = "Testing", module=None, run_only: list = N
             test_description = test_description.strip().split('\n')[0]
         
         print(f"\n{test_number}. {test_description}...")
+        print(output, end="")
         
-        # Run test with timing
-        try:
-            (result, status), elapsed = time_function(test_func)
-            test_results[test_name] = result
-            print(f"{status} ran in {elapsed:.4f} seconds")
-        except Exception as e:
-            test_results[test_name] = False
-            print(f"{RED}   ✗ Failed with exception: {e}{END}")
+        test_results[test_name] = result
+        if elapsed_ns is None:
+            print(status)
+        else:
+            print(f"{status} ran in {elapsed_ns / 1e9:.4f} seconds")
         
         test_number += 1
     
@@ -0,0 +1,121 @@
+"""
+Tests for the deprecated Stack class.
+"""
+
+import sys
+import warnings
+from pathlib import Path
+
+# Try importing directly first (if package is installed)
+try:
+    from nbody import Stack
+    from nbody.constants import GREEN, RED, END
+except ImportError:
+    # If not installed, add src to path
+    test_dir = Path(__file__).parent
+    src_dir = test_dir.parent / 'src'
+    sys.path.insert(0, str(src_dir))
+    from nbody import Stack
+    from nbody.constants import GREEN, RED, END
+
+# Import the test runner
+from test_runner import run_tests
+
+
+def _stack(capacity=64):
+    """A Stack, without the DeprecationWarning test_deprecated checks for."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        return Stack(capacity)
+
+
+def test_deprecated():
+    """Test that constructing a Stack emits a DeprecationWarning."""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        Stack()
+    try:
+        assert any(issubclass(w.category, DeprecationWarning) for w in caught), \
+            "   No DeprecationWarning was emitted"
+        # stacklevel=2 points the warning at the caller, not at stack.py
+        assert all(w.filename == __file__ for w in caught), \
+            f"   Warning attributed to {caught[0].filename}"
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_push_past_capacity():
+    """Test that the stack grows past its capacity and pops in LIFO order."""
+    stack = _stack(capacity=2)
+    for v in range(10):
+        stack.push(v)
+    result = [stack.pop() for _ in range(10)]
+    try:
+        assert result == list(range(9, -1, -1)), f"   Expected 9..0, got {result}"
+        assert len(stack.buf) >= 10, f"   Buffer holds {len(stack.buf)} elements"
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_len_and_truth():
+    """Test len(), truthiness and isEmpty while pushing and popping."""
+    stack = _stack(capacity=1)
+    sizes = []
+    for v in (3, 1, 4):
+        stack.push(v)
+        sizes.append((len(stack), bool(stack), stack.isEmpty()))
+    while stack:
+        stack.pop()
+        sizes.append((len(stack), bool(stack), stack.isEmpty()))
+    expected = [(1, True, False), (2, True, False), (3, True, False),
+                (2, True, False), (1, True, False), (0, False, True)]
+    try:
+        assert sizes == expected, f"   Expected {expected}, got {sizes}"
+        assert str(stack) == "[]", f"   Expected '[]', got {str(stack)!r}"
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_push_rejects_non_integers():
+    """Test that pushing something other than an integer raises TypeError."""
+    stack = _stack()
+    failures = []
+    for v in (object(), 1.5, "1"):
+        try:
+            stack.push(v)
+            failures.append(f"push({v!r}) did not raise")
+        except TypeError:
+            pass
+    try:
+        assert not failures, "   " + "; ".join(failures)
+        assert not stack, f"   Rejected values were pushed: {stack}"
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+def test_pop_empty():
+    """Test that popping an empty stack raises (when assertions are enabled)."""
+    if not __debug__:
+        return True, f"{GREEN}   ✓ Passed (check compiled out under python -O){END}"
+    stack = _stack()
+    stack.push(1)
+    stack.pop()
+    raised = False
+    try:
+        stack.pop()
+    except Exception:
+        raised = True
+    try:
+        assert raised, "   Popping an empty stack did not raise"
+        assert len(stack) == 0, f"   Failed pop changed the size to {len(stack)}"
+        return True, f"{GREEN}   ✓ Passed{END}"
+    except AssertionError as e:
+        return False, f"{RED}   ✗ Failed: {e}{END}"
+
+
+if __name__ == "__main__":
+    run_tests(test_name_prefix="Testing Stack")